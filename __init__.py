@@ -1,25 +1,72 @@
 # /config/custom_components/energy_optimizer/__init__.py
 
 import logging
+import time
+import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.start import async_at_started
 from homeassistant.components.climate.const import HVACMode, HVACAction
+from homeassistant.util import dt as dt_util
 from datetime import timedelta
 from .const import *
+from .rolling import RollingWindow
+from .websocket import async_register_websocket_commands
 
 _LOGGER = logging.getLogger(__name__)
 SCAN_INTERVAL = timedelta(minutes=1)
 
 PLATFORMS = ["climate", "sensor"]
 
+# Statut simulé (evaluate) d'une pièce sans décision (ex : Heat demandé en mode Été)
+NO_ACTION_STATUS = {"active_source": None, "reason": "Aucune action"}
+
+SCENARIO_SCHEMA = vol.Schema({
+    vol.Optional("name"): cv.string,
+    vol.Optional("gas_price"): vol.Coerce(float),
+    vol.Optional("elec_price"): vol.Coerce(float),
+    vol.Optional("inj_price"): vol.Coerce(float),
+    vol.Optional("outside_temp"): vol.Coerce(float),
+    vol.Optional("grid_power"): vol.Coerce(float),
+    vol.Optional("soc"): vol.Coerce(float),
+    vol.Optional("battery_threshold"): vol.Coerce(float),
+    vol.Optional("solar_exporting"): cv.boolean,
+    vol.Optional("summer"): cv.boolean,
+})
+
+EVALUATE_SCHEMA = vol.Schema({
+    vol.Optional("entry_id"): cv.string,
+    vol.Required("scenarios"): vol.All(cv.ensure_list, [SCENARIO_SCHEMA]),
+})
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+async def async_setup(hass: HomeAssistant, config: dict):
+    async_register_websocket_commands(hass)
+    _async_register_services(hass)
+    return True
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
+    setup_start = time.monotonic()
     hass.data.setdefault(DOMAIN, {})
     manager = EnergyManager(hass, entry)
     hass.data[DOMAIN][entry.entry_id] = manager
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    manager.setup_timings["platforms_s"] = round(time.monotonic() - setup_start, 3)
     entry.async_on_unload(entry.add_update_listener(update_listener))
+
+    # Timer enregistré tout de suite (désinscrit à l'unload), mais inactif jusqu'à async_start
     entry.async_on_unload(async_track_time_interval(hass, manager.update_loop, SCAN_INTERVAL))
+
+    # Première évaluation différée : une fois HA démarré (plateformes et entités d'entrée prêtes)
+    async def _async_start(hass: HomeAssistant):
+        await manager.async_start()
+        manager.setup_timings["ready_s"] = round(time.monotonic() - setup_start, 3)
+
+    entry.async_on_unload(async_at_started(hass, _async_start))
     return True
 
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry):
@@ -30,6 +77,26 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
         hass.data[DOMAIN].pop(entry.entry_id)
     return unload_ok
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Entrée supprimée : on termine les abonnements WebSocket restants."""
+    for callback_fn in hass.data.get(DATA_SUBSCRIBERS, {}).pop(entry.entry_id, []):
+        callback_fn({"type": "end"})
+
+def _async_register_services(hass: HomeAssistant):
+    async def handle_evaluate(call: ServiceCall):
+        """Simulation de scénarios : aucune commande envoyée aux climates."""
+        managers = hass.data.get(DOMAIN, {})
+        entry_id = call.data.get("entry_id")
+        manager = managers.get(entry_id) if entry_id else next(iter(managers.values()), None)
+        if manager is None:
+            raise HomeAssistantError(f"Energy Optimizer introuvable ({entry_id})")
+        return manager.evaluate_scenarios(call.data["scenarios"])
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_EVALUATE, handle_evaluate,
+        schema=EVALUATE_SCHEMA, supports_response=SupportsResponse.ONLY,
+    )
+
 
 class EnergyManager:
     def __init__(self, hass, entry):
@@ -39,6 +106,17 @@ class EnergyManager:
         self.options = entry.options
         self.sensors = []
         self.room_statuses = {}
+        self.room_commands = {}
+
+        # Démarrage différé (cf. async_start) : aucune évaluation avant
+        self._started = False
+        self.setup_timings = {}
+
+        # Abonnés WebSocket (energy_optimizer/subscribe), partagés avec le manager recréé au rechargement
+        self._subscribers = hass.data.setdefault(DATA_SUBSCRIBERS, {}).setdefault(entry.entry_id, [])
+        # Dernière décision publiée par pièce ; le premier envoi d'un manager est un snapshot complet
+        self._published = {}
+        self._snapshot_sent = False
         
         # Stockage des switchs (un par pièce)
         self.switches = {} 
@@ -54,12 +132,37 @@ class EnergyManager:
         self.hysteresis = self.options.get(CONF_HYSTERESIS, 0.5)
         self.summer_mode_id = self.options.get(CONF_SUMMER_MODE_ENTITY)
 
+        # Détection d'injection lissée (évite le flapping au passage d'un nuage)
+        self.export_threshold = self.options.get(CONF_EXPORT_THRESHOLD, DEFAULT_EXPORT_THRESHOLD)
+        self.export_hysteresis = self.options.get(CONF_EXPORT_HYSTERESIS, DEFAULT_EXPORT_HYSTERESIS)
+        self.solar_min_hold = timedelta(minutes=self.options.get(CONF_SOLAR_MIN_HOLD, DEFAULT_SOLAR_MIN_HOLD))
+        self.smooth_soc = self.options.get(CONF_SMOOTH_SOC, False)
+        window = int(timedelta(minutes=self.options.get(CONF_SMOOTHING_WINDOW, DEFAULT_SMOOTHING_WINDOW)) / SCAN_INTERVAL)
+        self.grid_stats = RollingWindow(window)
+        self.soc_stats = RollingWindow(window)
+        self.solar_exporting = False
+        self.solar_since = None
+
         self.rooms = self.options.get(CONF_ROOMS, [])
         self.map_cons_price = {1: CONF_PRICE_T1, 2: CONF_PRICE_T2, 3: CONF_PRICE_T3}
         self.map_inj_price = {1: CONF_INJ_PRICE_T1, 2: CONF_INJ_PRICE_T2, 3: CONF_INJ_PRICE_T3}
         
+        self.input_ids = [eid for eid in {
+            self.tariff_sensor, self.gaz_price_id, self.battery_id, self.outside_temp_id,
+            self.grid_power_id, self.battery_thresh_id, self.summer_mode_id,
+            *(self.config.get(key) for key in [*self.map_cons_price.values(), *self.map_inj_price.values()]),
+            *(room.get(CONF_TEMP_SENSOR) for room in self.rooms),
+        } if eid]
+
         _LOGGER.info(f"📊 EnergyManager initialized with {len(self.rooms)} rooms")
 
+    async def async_start(self):
+        """Active le manager : première évaluation complète, à partir d'un snapshot groupé des entités d'entrée."""
+        start = time.monotonic()
+        self._started = True
+        await self.update_loop(dt_util.utcnow(), self._take_snapshot())
+        self.setup_timings["first_evaluation_s"] = round(time.monotonic() - start, 3)
+
     def register_sensor(self, sensor):
         self.sensors.append(sensor)
 
@@ -82,24 +185,127 @@ class EnergyManager:
         for sensor in self.sensors:
             sensor.update_from_manager()
 
-    def _get_entity_value(self, entity_id):
+    def async_subscribe(self, callback_fn):
+        """Abonne un callback aux événements (snapshot/delta/end). Retourne la fonction de désabonnement."""
+        self._subscribers.append(callback_fn)
+        def unsubscribe():
+            if callback_fn in self._subscribers: self._subscribers.remove(callback_fn)
+        return unsubscribe
+
+    def _room_payload(self, idx):
+        return {
+            "room_index": idx,
+            "room": self.rooms[idx].get(CONF_ROOM_NAME, f"Room {idx}"),
+            **self.room_statuses.get(idx, {}),
+            "commands": self.room_commands.get(idx, []),
+        }
+
+    def get_snapshot(self):
+        return {
+            "rooms": [self._room_payload(idx) for idx in range(len(self.rooms))],
+            "solar": self.get_solar_stats(),
+        }
+
+    def _decision_key(self, idx):
+        """
+        Champs de décision comparés d'un tick à l'autre. La raison (qui contient la puissance lissée)
+        et sent/unchanged ne comptent pas : seuls la source, les coûts arrondis, le COP et l'issue des commandes.
+        """
+        status = self.room_statuses.get(idx, {})
+        def rounded(value, digits):
+            return round(value, digits) if value is not None else None
+        return (
+            status.get("active_source"),
+            rounded(status.get("cost_ac"), 4),
+            rounded(status.get("cost_gas"), 4),
+            rounded(status.get("cop"), 2),
+            tuple(
+                (cmd["entity_id"], cmd["hvac_mode"], cmd["temperature"], cmd["result"] in ["sent", "unchanged"])
+                for cmd in self.room_commands.get(idx, [])
+            ),
+        )
+
+    def _publish_deltas(self):
+        """
+        Envoie aux abonnés uniquement les pièces dont la décision a changé depuis le dernier tick.
+        Premier envoi d'un manager (démarrage ou rechargement) : snapshot complet.
+        """
+        changed = []
+        for idx in range(len(self.rooms)):
+            key = self._decision_key(idx)
+            if self._published.get(idx) != key:
+                self._published[idx] = key
+                changed.append(self._room_payload(idx))
+        if not self._snapshot_sent:
+            self._snapshot_sent = True
+            event = {"type": "snapshot", **self.get_snapshot()}
+        elif changed: event = {"type": "delta", "rooms": changed}
+        else: return
+        for callback_fn in list(self._subscribers):
+            callback_fn(event)
+
+    def _take_snapshot(self):
+        """Lecture groupée de toutes les entités d'entrée, utilisée pour la première évaluation."""
+        return {eid: self.hass.states.get(eid) for eid in self.input_ids}
+
+    def _get_state(self, entity_id, states=None):
+        if states is not None and entity_id in states: return states[entity_id]
+        return self.hass.states.get(entity_id)
+
+    def _get_entity_value(self, entity_id, states=None):
         if not entity_id: return None
-        state = self.hass.states.get(entity_id)
+        state = self._get_state(entity_id, states)
         if state and state.state not in ["unknown", "unavailable"]:
             try: return float(state.state)
             except ValueError: return None
         return None
 
-    def _is_summer_mode(self):
+    def _is_summer_mode(self, states=None):
         if not self.summer_mode_id: return False
-        state = self.hass.states.get(self.summer_mode_id)
+        state = self._get_state(self.summer_mode_id, states)
         if state and state.state == "on": return True
         return False
 
-    def _get_active_tariff_index(self):
+    def _sample(self, stats, value, now):
+        """
+        Ajoute un échantillon uniquement sur les ticks du timer (ou si la fenêtre est vide).
+        Une lecture indisponible est ignorée (la fenêtre garde ses valeurs) ; au-delà d'une fenêtre
+        complète sans lecture valide, les statistiques sont vidées (valeur périmée).
+        """
+        if value is None:
+            if now is not None: stats.mark_missing()
+            if stats.stale and stats.count: stats.clear()
+        elif now is not None or not stats.count: stats.push(value)
+
+    def _update_solar_state(self, now, states=None):
+        """Détection d'injection sur la puissance lissée (EWMA) avec hystérésis et temps de maintien."""
+        self._sample(self.grid_stats, self._get_entity_value(self.grid_power_id, states), now)
+        smoothed = self.grid_stats.ewma
+
+        # Pas de lecture valide depuis une fenêtre complète : pas d'injection (temps de maintien respecté)
+        if smoothed is None: wanted = False
+        elif self.solar_exporting: wanted = smoothed < -max(0, self.export_threshold - self.export_hysteresis)
+        else: wanted = smoothed < -self.export_threshold
+
+        if wanted != self.solar_exporting:
+            current = now or dt_util.utcnow()
+            if self.solar_since is None or current - self.solar_since >= self.solar_min_hold:
+                self.solar_exporting = wanted
+                self.solar_since = current
+        return smoothed, self.solar_exporting
+
+    def get_solar_stats(self):
+        return {
+            "grid_power": self.grid_stats.as_dict(),
+            "soc": self.soc_stats.as_dict(),
+            "solar_exporting": self.solar_exporting,
+            "solar_since": self.solar_since.isoformat() if self.solar_since else None,
+        }
+
+    def _get_active_tariff_index(self, states=None):
         if self.mode == MODE_SINGLE: return 1
         if not self.tariff_sensor: return 2
-        state = self.hass.states.get(self.tariff_sensor)
+        state = self._get_state(self.tariff_sensor, states)
         if not state or state.state in ["unknown", "unavailable"]: return 2
         val = str(state.state).strip().lower()
         if val in ["1", "1.0", "low", "night", "off_peak", "eco"]: return 1
@@ -107,10 +313,10 @@ class EnergyManager:
         if val in ["3", "3.0", "high", "super_peak"]: return 3
         return 2
 
-    def _get_current_prices(self):
-        idx = self._get_active_tariff_index()
-        price_cons = self._get_entity_value(self.config.get(self.map_cons_price.get(idx)))
-        price_inj = self._get_entity_value(self.config.get(self.map_inj_price.get(idx)))
+    def _get_current_prices(self, states=None):
+        idx = self._get_active_tariff_index(states)
+        price_cons = self._get_entity_value(self.config.get(self.map_cons_price.get(idx)), states)
+        price_inj = self._get_entity_value(self.config.get(self.map_inj_price.get(idx)), states)
         return idx, price_cons, price_inj
 
     def _interpolate_cop(self, temp_ext, room_config):
@@ -129,162 +335,269 @@ class EnergyManager:
             if x1 <= temp_ext <= x2: return y1 + (temp_ext - x1) * (y2 - y1) / (x2 - x1)
         return 4.0
 
-    async def update_loop(self, now=None):
-        """Boucle principale d'optimisation."""
-        tariff_idx, prix_elec_cons, prix_elec_inj = self._get_current_prices()
-        prix_gaz = self._get_entity_value(self.gaz_price_id)
+    def _read_inputs(self, now=None, live=True, states=None):
+        """
+        Lecture des entrées globales (prix, météo, batterie, solaire). None si prix élec indisponible.
+        live=False : lecture seule, sans échantillonnage ni changement de l'état solaire (simulation).
+        """
+        tariff_idx, prix_elec_cons, prix_elec_inj = self._get_current_prices(states)
+        prix_gaz = self._get_entity_value(self.gaz_price_id, states)
         if not prix_gaz: prix_gaz = 0.085
-        if prix_elec_cons is None: return
+        if prix_elec_cons is None and live: return None
 
-        temp_ext = self._get_entity_value(self.outside_temp_id)
+        temp_ext = self._get_entity_value(self.outside_temp_id, states)
         if temp_ext is None: temp_ext = 25.0
 
-        is_summer = self._is_summer_mode()
-
         # Batterie
-        soc = 0; has_battery = False; battery_forced = False
-        thresh_val = self._get_entity_value(self.battery_thresh_id)
+        soc = 0; has_battery = False
+        thresh_val = self._get_entity_value(self.battery_thresh_id, states)
         if thresh_val is None: thresh_val = 30.0
         if self.battery_id:
-            val = self._get_entity_value(self.battery_id)
+            val = self._get_entity_value(self.battery_id, states)
+            if live: self._sample(self.soc_stats, val, now)
+            if self.smooth_soc: val = round(self.soc_stats.ewma, 1) if self.soc_stats.ewma is not None else None
             if val is not None:
                 soc = val; has_battery = True
-                if soc > thresh_val: battery_forced = True
-        
+
         # Solaire
-        effective_elec_price = prix_elec_cons
+        if live: grid_power, solar_state = self._update_solar_state(now, states)
+        else: grid_power, solar_state = self.grid_stats.ewma, self.solar_exporting
+        if grid_power is not None: grid_power = round(grid_power)
+
+        return {
+            "tariff": tariff_idx,
+            "elec_price": prix_elec_cons,
+            "inj_price": prix_elec_inj,
+            "gas_price": prix_gaz,
+            "outside_temp": temp_ext,
+            "summer": self._is_summer_mode(states),
+            "soc": soc,
+            "has_battery": has_battery,
+            "battery_threshold": thresh_val,
+            "grid_power": grid_power,
+            "solar_exporting": solar_state,
+        }
+
+    @staticmethod
+    def _build_context(inputs):
+        """Dérive le prix effectif et les forçages à partir des entrées."""
+        effective_elec_price = inputs["elec_price"]
         is_solar_exporting = False
-        grid_power = self._get_entity_value(self.grid_power_id)
-        if grid_power is not None and grid_power < -500:
-            if prix_elec_inj is not None:
-                effective_elec_price = prix_elec_inj
-                is_solar_exporting = True
+        if inputs["solar_exporting"] and inputs["inj_price"] is not None:
+            effective_elec_price = inputs["inj_price"]
+            is_solar_exporting = True
+        battery_forced = inputs["has_battery"] and inputs["soc"] > inputs["battery_threshold"]
+        return {
+            **inputs,
+            "effective_elec_price": effective_elec_price,
+            "is_solar_exporting": is_solar_exporting,
+            "battery_forced": battery_forced,
+        }
+
+    @staticmethod
+    def _off_commands(clim_ac, clim_gaz):
+        commands = []
+        if clim_ac: commands.append((clim_ac, "off", None))
+        if clim_gaz:
+            if clim_gaz == 'climate.thermostat_hc1':
+                commands.append((clim_gaz, "heat", 16))
+            commands.append((clim_gaz, "off", None))
+        return commands
+
+    def _decide_room(self, room, requested_mode, target_temp, current_temp, cop, ctx):
+        """
+        Décision pure pour une pièce : aucune commande n'est envoyée.
+        Retourne les commandes à appliquer, l'état du switch et le statut, ou None si rien à faire.
+        """
+        clim_gaz = room.get(CONF_CLIMATE_GAZ)
+        clim_ac = room.get(CONF_CLIMATE_AC)
+
+        def decision(commands, action, switch_reason, status):
+            return {"commands": commands, "action": action, "switch_reason": switch_reason, "status": status}
+
+        # Sécurité capteur
+        if current_temp is None:
+            return decision(self._off_commands(clim_ac, clim_gaz), HVACAction.OFF, "Sensor error",
+                            {"active_source": "Error", "reason": "Capteur HS"})
+
+        # === VT DEMANDE OFF ===
+        if requested_mode == HVACMode.OFF:
+            return decision(self._off_commands(clim_ac, clim_gaz), HVACAction.OFF, "VT OFF",
+                            {"active_source": "Off (VT)", "reason": "Versatile Thermostat: OFF"})
+
+        is_summer = ctx["summer"]
+
+        # === TEMPÉRATURE ATTEINTE (Hystérésis gérée par EO en sécurité, mais VT le gère aussi) ===
+        # On garde cette sécurité au cas où VT envoie Heat alors qu'il fait chaud
+        if not is_summer and current_temp >= (target_temp + self.hysteresis):
+            return decision(self._off_commands(clim_ac, clim_gaz), HVACAction.IDLE, "Temp OK",
+                            {"active_source": "Off (Temp OK)", "reason": "Température atteinte"})
+
+        prix_gaz = ctx["gas_price"]
+
+        # === VT DEMANDE CHAUFFAGE ===
+        if requested_mode in [HVACMode.HEAT, HVACMode.HEAT_COOL] and not is_summer:
+            should_heat_ac = False
+            should_heat_gas = False
+            reason = ""
+            cout_pac_kwh = None
+
+            # Calcul Rentabilité
+            if clim_ac:
+                safe_cop = cop if cop > 0.1 else 0.1
+                cout_pac_kwh = ctx["effective_elec_price"] / safe_cop
+
+                if ctx["battery_forced"]:
+                    should_heat_ac = True; reason = f"Batterie ({ctx['soc']}%)"
+                elif cout_pac_kwh < prix_gaz:
+                    should_heat_ac = True
+                    if ctx["is_solar_exporting"] and ctx["grid_power"] is not None: reason = f"Solaire ({ctx['grid_power']}W)"
+                    elif ctx["is_solar_exporting"]: reason = "Solaire"
+                    else: reason = f"PAC moins chère"
+                else:
+                    should_heat_gas = True
+                    reason = f"Gaz moins cher"
+
+            # Disponibilité équipements
+            if clim_ac and clim_gaz: pass
+            elif clim_ac and not clim_gaz: should_heat_ac = True; reason = "PAC seule"
+            elif clim_gaz and not clim_ac: should_heat_gas = True; reason = "Gaz seul"
+
+            # Action
+            if should_heat_ac:
+                commands = [(clim_ac, "heat", target_temp)] + self._off_commands(None, clim_gaz)
+                return decision(commands, HVACAction.HEATING, reason,
+                                {"active_source": "AC (Heat)", "reason": reason, "cost_ac": cout_pac_kwh, "cost_gas": prix_gaz, "cop": cop})
+
+            if should_heat_gas:
+                commands = [(clim_gaz, "heat", target_temp)] + self._off_commands(clim_ac, None)
+                return decision(commands, HVACAction.HEATING, reason,
+                                {"active_source": "Gaz", "reason": reason, "cost_ac": cout_pac_kwh, "cost_gas": prix_gaz, "cop": cop})
+
+        # === VT DEMANDE REFROIDISSEMENT (ÉTÉ) ===
+        elif requested_mode in [HVACMode.COOL, HVACMode.HEAT_COOL] and is_summer:
+            if not clim_ac:
+                return decision([], HVACAction.IDLE, "Pas d'AC", {"active_source": "Off", "reason": "Pas d'AC"})
+
+            if current_temp > target_temp:
+                if ctx["is_solar_exporting"] or ctx["battery_forced"]:
+                    reason = f"Solaire/Batterie"
+                    return decision([(clim_ac, "cool", target_temp)], HVACAction.COOLING, reason,
+                                    {"active_source": "AC (Cooling)", "reason": reason})
+                return decision([(clim_ac, "off", None)], HVACAction.IDLE, "Attente Solaire",
+                                {"active_source": "Off", "reason": "Attente Solaire"})
+
+            return decision([(clim_ac, "off", None)], HVACAction.IDLE, "Temp OK",
+                            {"active_source": "Off", "reason": "Temp OK"})
+
+        return None
+
+    async def update_loop(self, now=None, states=None):
+        """
+        Boucle principale d'optimisation. Inactive tant que le manager n'est pas démarré.
+        states : snapshot optionnel des entités d'entrée (sinon lecture directe).
+        """
+        if not self._started: return
+        inputs = self._read_inputs(now, states=states)
+        if inputs is None: return
+        ctx = self._build_context(inputs)
 
         # ===== BOUCLE PIÈCES =====
         for idx, room in enumerate(self.rooms):
-            clim_gaz = room.get(CONF_CLIMATE_GAZ)
-            clim_ac = room.get(CONF_CLIMATE_AC)
             switch = self.switches.get(idx)
-            
+
             # Si pas de switch (erreur init), on passe
             if not switch: continue
 
-            requested_mode = switch.hvac_mode
-            target_temp = switch.target_temperature
-            current_temp = self._get_entity_value(room.get(CONF_TEMP_SENSOR))
-            
-            # Sécurité capteur
-            if current_temp is None:
-                if clim_ac: await self._set_climate(clim_ac, "off", None)
-                if clim_gaz: 
-                    if room.get(CONF_CLIMATE_GAZ) == 'climate.thermostat_hc1':
-                        await self._set_climate(clim_gaz, "heat", 16)
-                    await self._set_climate(clim_gaz, "off", None)
-                switch.update_from_manager(None, HVACAction.OFF, "Sensor error")
-                self.room_statuses[idx] = {"active_source": "Error", "reason": "Capteur HS"}
-                continue
-            
-            # === VT DEMANDE OFF ===
-            if requested_mode == HVACMode.OFF:
-                if clim_ac: await self._set_climate(clim_ac, "off", None)
-                if clim_gaz: 
-                    if room.get(CONF_CLIMATE_GAZ) == 'climate.thermostat_hc1':
-                        await self._set_climate(clim_gaz, "heat", 16)
-                    await self._set_climate(clim_gaz, "off", None)
-                switch.update_from_manager(current_temp, HVACAction.OFF, "VT OFF")
-                self.room_statuses[idx] = {"active_source": "Off (VT)", "reason": "Versatile Thermostat: OFF"}
-                continue
-            
-            # === TEMPÉRATURE ATTEINTE (Hystérésis gérée par EO en sécurité, mais VT le gère aussi) ===
-            # On garde cette sécurité au cas où VT envoie Heat alors qu'il fait chaud
-            if not is_summer and current_temp >= (target_temp + self.hysteresis):
-                if clim_ac: await self._set_climate(clim_ac, "off", None)
-                if clim_gaz: 
-                    if room.get(CONF_CLIMATE_GAZ) == 'climate.thermostat_hc1':
-                        await self._set_climate(clim_gaz, "heat", 16)
-                    await self._set_climate(clim_gaz, "off", None)
-                switch.update_from_manager(current_temp, HVACAction.IDLE, "Temp OK")
-                self.room_statuses[idx] = {"active_source": "Off (Temp OK)", "reason": "Température atteinte"}
+            current_temp = self._get_entity_value(room.get(CONF_TEMP_SENSOR), states)
+            cop = self._interpolate_cop(ctx["outside_temp"], room) if room.get(CONF_CLIMATE_AC) else None
+
+            decision = self._decide_room(room, switch.hvac_mode, switch.target_temperature, current_temp, cop, ctx)
+            if decision is None:
+                # Aucune commande envoyée : les équipements restent dans l'état du dernier statut appliqué
+                self.room_commands[idx] = []
                 continue
-            
-            # === VT DEMANDE CHAUFFAGE ===
-            if requested_mode in [HVACMode.HEAT, HVACMode.HEAT_COOL] and not is_summer:
-                should_heat_ac = False
-                should_heat_gas = False
-                reason = ""
-                cop = 0
-                cout_pac_kwh = 0
-                
-                # Calcul Rentabilité
-                if clim_ac:
-                    cop = self._interpolate_cop(temp_ext, room)
-                    safe_cop = cop if cop > 0.1 else 0.1
-                    cout_pac_kwh = effective_elec_price / safe_cop
-                    
-                    if battery_forced:
-                        should_heat_ac = True; reason = f"Batterie ({soc}%)"
-                    elif cout_pac_kwh < prix_gaz:
-                        should_heat_ac = True
-                        if is_solar_exporting: reason = f"Solaire ({grid_power}W)"
-                        else: reason = f"PAC moins chère"
-                    else:
-                        should_heat_gas = True
-                        reason = f"Gaz moins cher"
-                
-                # Disponibilité équipements
-                if clim_ac and clim_gaz: pass
-                elif clim_ac and not clim_gaz: should_heat_ac = True; reason = "PAC seule"
-                elif clim_gaz and not clim_ac: should_heat_gas = True; reason = "Gaz seul"
-                
-                # Action
-                if should_heat_ac:
-                    await self._set_climate(clim_ac, "heat", target_temp)
-                    if clim_gaz: 
-                        if room.get(CONF_CLIMATE_GAZ) == 'climate.thermostat_hc1':
-                            await self._set_climate(clim_gaz, "heat", 16)
-                        await self._set_climate(clim_gaz, "off", None)
-                    switch.update_from_manager(current_temp, HVACAction.HEATING, reason)
-                    self.room_statuses[idx] = {"active_source": "AC (Heat)", "reason": reason, "cost_ac": cout_pac_kwh, "cost_gas": prix_gaz}
-                
-                elif should_heat_gas:
-                    await self._set_climate(clim_gaz, "heat", target_temp)
-                    if clim_ac: await self._set_climate(clim_ac, "off", None)
-                    switch.update_from_manager(current_temp, HVACAction.HEATING, reason)
-                    self.room_statuses[idx] = {"active_source": "Gaz", "reason": reason, "cost_ac": cout_pac_kwh, "cost_gas": prix_gaz}
-            
-            # === VT DEMANDE REFROIDISSEMENT (ÉTÉ) ===
-            elif requested_mode in [HVACMode.COOL, HVACMode.HEAT_COOL] and is_summer:
-                if not clim_ac:
-                    switch.update_from_manager(current_temp, HVACAction.IDLE, "Pas d'AC")
-                    self.room_statuses[idx] = {"active_source": "Off", "reason": "Pas d'AC"}
-                
-                elif current_temp > target_temp:
-                    if is_solar_exporting or battery_forced:
-                        reason = f"Solaire/Batterie"
-                        await self._set_climate(clim_ac, "cool", target_temp)
-                        switch.update_from_manager(current_temp, HVACAction.COOLING, reason)
-                        self.room_statuses[idx] = {"active_source": "AC (Cooling)", "reason": reason}
-                    else:
-                        await self._set_climate(clim_ac, "off", None)
-                        switch.update_from_manager(current_temp, HVACAction.IDLE, "Attente Solaire")
-                        self.room_statuses[idx] = {"active_source": "Off", "reason": "Attente Solaire"}
-                else:
-                    await self._set_climate(clim_ac, "off", None)
-                    switch.update_from_manager(current_temp, HVACAction.IDLE, "Temp OK")
-                    self.room_statuses[idx] = {"active_source": "Off", "reason": "Temp OK"}
+
+            outcomes = []
+            for entity_id, mode, temp in decision["commands"]:
+                result = await self._set_climate(entity_id, mode, temp)
+                outcomes.append({"entity_id": entity_id, "hvac_mode": mode, "temperature": temp, "result": result})
+            switch.update_from_manager(current_temp, decision["action"], decision["switch_reason"])
+            self.room_statuses[idx] = decision["status"]
+            self.room_commands[idx] = outcomes
 
         self._notify_sensors()
+        self._publish_deltas()
+
+    def evaluate_scenarios(self, scenarios):
+        """
+        Simulation "what-if" : évalue les pièces actuelles pour chaque scénario, sans aucune commande.
+        Les états des pièces et les entrées globales sont lus une seule fois pour tout le lot.
+        """
+        base = self._read_inputs(live=False)
+
+        rooms = []
+        for idx, room in enumerate(self.rooms):
+            switch = self.switches.get(idx)
+            if not switch: continue
+            rooms.append((
+                idx, room, switch.hvac_mode, switch.target_temperature,
+                self._get_entity_value(room.get(CONF_TEMP_SENSOR)),
+            ))
+
+        cop_cache = {}
+        results = []
+        for scenario_idx, scenario in enumerate(scenarios):
+            inputs = {**base, **{k: v for k, v in scenario.items() if k in base}}
+            if "grid_power" in scenario and "solar_exporting" not in scenario:
+                inputs["solar_exporting"] = scenario["grid_power"] < -self.export_threshold
+            if "soc" in scenario: inputs["has_battery"] = True
+
+            result = {"name": scenario.get("name", f"Scenario {scenario_idx + 1}"), "inputs": inputs, "rooms": []}
+            results.append(result)
+            if inputs["elec_price"] is None:
+                result["error"] = "Prix électricité indisponible"
+                continue
+
+            ctx = self._build_context(inputs)
+            temp_ext = ctx["outside_temp"]
+            for idx, room, requested_mode, target_temp, current_temp in rooms:
+                cop = None
+                if room.get(CONF_CLIMATE_AC):
+                    key = (idx, temp_ext)
+                    if key not in cop_cache: cop_cache[key] = self._interpolate_cop(temp_ext, room)
+                    cop = cop_cache[key]
+
+                # Même source de vérité que la boucle live : le statut calculé par _decide_room
+                decision = self._decide_room(room, requested_mode, target_temp, current_temp, cop, ctx)
+                status = decision["status"] if decision else NO_ACTION_STATUS
+                result["rooms"].append({
+                    "room": room.get(CONF_ROOM_NAME, f"Room {idx}"),
+                    "source": status.get("active_source"),
+                    "reason": status.get("reason"),
+                    "cop": status.get("cop"),
+                    "cost_ac": status.get("cost_ac"),
+                    "cost_gas": ctx["gas_price"],
+                })
+
+        return {"scenarios": results}
 
     async def _set_climate(self, entity_id, mode, temp):
+        """Pilote un climate. Retourne le résultat : unavailable, unchanged, sent ou error."""
         state = self.hass.states.get(entity_id)
-        if not state or state.state in ["unavailable", "unknown"]: return
+        if not state or state.state in ["unavailable", "unknown"]: return "unavailable"
         
+        result = "unchanged"
         try:
             if state.state != mode:
                 await self.hass.services.async_call("climate", "set_hvac_mode", {"entity_id": entity_id, "hvac_mode": mode})
+                result = "sent"
             if mode in ["heat", "cool"] and temp is not None:
                 current_target = state.attributes.get("temperature", 0)
                 if float(current_target) != temp:
                     await self.hass.services.async_call("climate", "set_temperature", {"entity_id": entity_id, "temperature": temp})
+                    result = "sent"
         except Exception as e:
-            _LOGGER.error(f"❌ Failed to control {entity_id}: {e}")
\ No newline at end of file
+            _LOGGER.error(f"❌ Failed to control {entity_id}: {e}")
+            return "error"
+        return result
\ No newline at end of file
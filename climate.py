@@ -28,11 +28,10 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_e
         
         # Enregistrement dans le manager pour qu'il puisse le piloter
         manager.register_switch(room_idx, switch)
-        
-        room_name = room.get(CONF_ROOM_NAME, f"Room {room_idx}")
-        _LOGGER.info(f"✅ EO Switch created for: {room_name}")
     
-    async_add_entities(climates, True)
+    # Ajout groupé, sans update forcé : la première évaluation est faite par le manager au démarrage
+    async_add_entities(climates)
+    _LOGGER.info(f"✅ {len(climates)} EO Switches created")
 
 
 class EnergyOptimizerSwitch(ClimateEntity):
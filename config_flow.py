@@ -136,8 +136,10 @@ class EnergyOptimizerOptionsFlow(config_entries.OptionsFlow):
             })
         )
 
-    async def async_step_global_settings(self, user_input=None):
+    async def async_step_global_settings(self, user_input=None, errors=None):
         if user_input is not None:
+            if user_input.get(CONF_EXPORT_HYSTERESIS, 0) > user_input.get(CONF_EXPORT_THRESHOLD, DEFAULT_EXPORT_THRESHOLD):
+                return await self.async_step_global_settings(errors={"base": "export_hysteresis_too_high"})
             self.options.update(user_input)
             self._save_changes()
             return await self.async_step_menu()
@@ -160,8 +162,21 @@ class EnergyOptimizerOptionsFlow(config_entries.OptionsFlow):
             vol.Required(CONF_HYSTERESIS, default=current_hysteresis): selector.NumberSelector(
                 selector.NumberSelectorConfig(min=0.1, max=5.0, step=0.1, mode="slider", unit_of_measurement="°C")
             ),
+            vol.Required(CONF_EXPORT_THRESHOLD, default=self.options.get(CONF_EXPORT_THRESHOLD, DEFAULT_EXPORT_THRESHOLD)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=0, max=10000, step=50, mode="box", unit_of_measurement="W")
+            ),
+            vol.Required(CONF_EXPORT_HYSTERESIS, default=self.options.get(CONF_EXPORT_HYSTERESIS, DEFAULT_EXPORT_HYSTERESIS)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=0, max=5000, step=50, mode="box", unit_of_measurement="W")
+            ),
+            vol.Required(CONF_SMOOTHING_WINDOW, default=self.options.get(CONF_SMOOTHING_WINDOW, DEFAULT_SMOOTHING_WINDOW)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=1, max=60, step=1, mode="slider", unit_of_measurement="min")
+            ),
+            vol.Required(CONF_SOLAR_MIN_HOLD, default=self.options.get(CONF_SOLAR_MIN_HOLD, DEFAULT_SOLAR_MIN_HOLD)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=0, max=60, step=1, mode="slider", unit_of_measurement="min")
+            ),
+            vol.Required(CONF_SMOOTH_SOC, default=self.options.get(CONF_SMOOTH_SOC, False)): selector.BooleanSelector(),
         })
-        return self.async_show_form(step_id="global_settings", data_schema=schema)
+        return self.async_show_form(step_id="global_settings", data_schema=schema, errors=errors)
 
     async def async_step_room_name(self, user_input=None):
         if user_input is not None:
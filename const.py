@@ -2,6 +2,12 @@
 
 DOMAIN = "energy_optimizer"
 
+# Services
+SERVICE_EVALUATE = "evaluate"
+
+# Abonnés WebSocket par entry_id (survivent au rechargement du manager)
+DATA_SUBSCRIBERS = f"{DOMAIN}_subscribers"
+
 # --- GLOBAL ---
 CONF_TARIFF_MODE = "tariff_mode"
 CONF_TARIFF_SENSOR = "tariff_sensor"
@@ -11,6 +17,17 @@ CONF_GRID_POWER_ENTITY = "grid_power_entity"
 CONF_BATTERY_THRESH_ENTITY = "battery_thresh_entity"
 CONF_HYSTERESIS = "hysteresis"
 
+# Lissage Solaire (statistiques glissantes)
+CONF_EXPORT_THRESHOLD = "export_threshold"
+CONF_EXPORT_HYSTERESIS = "export_hysteresis"
+CONF_SMOOTHING_WINDOW = "smoothing_window"
+CONF_SOLAR_MIN_HOLD = "solar_min_hold"
+CONF_SMOOTH_SOC = "smooth_soc"
+DEFAULT_EXPORT_THRESHOLD = 500
+DEFAULT_EXPORT_HYSTERESIS = 200
+DEFAULT_SMOOTHING_WINDOW = 5
+DEFAULT_SOLAR_MIN_HOLD = 5
+
 # Entité Switch Été/Hiver
 CONF_SUMMER_MODE_ENTITY = "summer_mode_entity"
 
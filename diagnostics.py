@@ -0,0 +1,16 @@
+# /config/custom_components/energy_optimizer/diagnostics.py
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from .const import DOMAIN
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry):
+    """Diagnostics : temps de démarrage, statistiques solaires et état des pièces."""
+    manager = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "setup_timings": manager.setup_timings,
+        "rooms_count": len(manager.rooms),
+        "input_entities": len(manager.input_ids),
+        **manager.get_snapshot(),
+    }
@@ -0,0 +1,88 @@
+# /config/custom_components/energy_optimizer/rolling.py
+
+from collections import deque
+
+
+class RollingWindow:
+    """
+    Statistiques glissantes incrémentales sur les N derniers échantillons.
+    Buffer circulaire : moyenne, minimum et EWMA mis à jour en O(1).
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, int(size))
+        self._buffer = [0.0] * self.size
+        self._pos = 0
+        self._count = 0
+        self._sum = 0.0
+        self._seq = 0
+        # File monotone (seq, valeur) pour le minimum glissant
+        self._min_queue = deque()
+        self.alpha = 2.0 / (self.size + 1)
+        self.ewma = None
+        self.last = None
+        # Ticks consécutifs sans lecture valide (cf. stale)
+        self.missed = 0
+
+    def push(self, value: float):
+        value = float(value)
+        if self._count == self.size:
+            self._sum -= self._buffer[self._pos]
+        else:
+            self._count += 1
+        self._buffer[self._pos] = value
+        self._pos = (self._pos + 1) % self.size
+        self._sum += value
+
+        # Minimum : on retire les valeurs sorties de la fenêtre et celles qui ne seront jamais le min
+        while self._min_queue and self._min_queue[-1][1] >= value:
+            self._min_queue.pop()
+        self._min_queue.append((self._seq, value))
+        if self._min_queue[0][0] <= self._seq - self.size:
+            self._min_queue.popleft()
+        self._seq += 1
+
+        self.ewma = value if self.ewma is None else self.ewma + self.alpha * (value - self.ewma)
+        self.last = value
+        self.missed = 0
+
+    def mark_missing(self):
+        self.missed += 1
+
+    def clear(self):
+        self._pos = 0
+        self._count = 0
+        self._sum = 0.0
+        self._min_queue.clear()
+        self.ewma = None
+        self.last = None
+        self.missed = 0
+
+    @property
+    def stale(self):
+        """Aucune lecture valide depuis une fenêtre complète."""
+        return self.missed >= self.size
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def mean(self):
+        if not self._count: return None
+        return self._sum / self._count
+
+    @property
+    def minimum(self):
+        if not self._min_queue: return None
+        return self._min_queue[0][1]
+
+    def as_dict(self):
+        return {
+            "last": self.last,
+            "ewma": self.ewma,
+            "mean": self.mean,
+            "min": self.minimum,
+            "samples": self._count,
+            "missed": self.missed,
+        }
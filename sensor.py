@@ -13,11 +13,14 @@ async def async_setup_entry(hass, entry, async_add_entities):
     for room_idx, room in enumerate(manager.rooms):
         sensors.append(EnergyOptimizerRoomSensor(manager, room, room_idx))
     
-    async_add_entities(sensors, True)
+    async_add_entities(sensors)
 
 class EnergyOptimizerRoomSensor(SensorEntity):
     """Sensor qui expose les calculs pour une pièce."""
 
+    # Valeurs qui changent à chaque tick : suivies en direct via energy_optimizer/subscribe, pas par le recorder
+    _unrecorded_attributes = frozenset({"current_cop", "cost_ac_kwh", "cost_gas_kwh", "reason"})
+
     def __init__(self, manager, room_config, room_idx):
         self._manager = manager
         self._room_config = room_config
@@ -0,0 +1,40 @@
+# /config/custom_components/energy_optimizer/websocket.py
+
+import voluptuous as vol
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from .const import DOMAIN
+
+WS_TYPE_SUBSCRIBE = f"{DOMAIN}/subscribe"
+
+
+@callback
+def async_register_websocket_commands(hass: HomeAssistant):
+    websocket_api.async_register_command(hass, ws_subscribe)
+
+
+@websocket_api.websocket_command({
+    vol.Required("type"): WS_TYPE_SUBSCRIBE,
+    vol.Optional("entry_id"): str,
+})
+@callback
+def ws_subscribe(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict):
+    """
+    Flux des décisions par pièce.
+    Envoie un snapshot complet à l'abonnement, puis à chaque tick les seules pièces qui ont changé.
+    Après un rechargement de l'intégration, le nouveau manager renvoie un snapshot aux mêmes abonnés.
+    """
+    managers = hass.data.get(DOMAIN, {})
+    entry_id = msg.get("entry_id")
+    manager = managers.get(entry_id) if entry_id else next(iter(managers.values()), None)
+    if manager is None:
+        connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, f"Energy Optimizer introuvable ({entry_id})")
+        return
+
+    @callback
+    def forward_event(event):
+        connection.send_message(websocket_api.event_message(msg["id"], event))
+
+    connection.subscriptions[msg["id"]] = manager.async_subscribe(forward_event)
+    connection.send_result(msg["id"])
+    connection.send_message(websocket_api.event_message(msg["id"], {"type": "snapshot", **manager.get_snapshot()}))